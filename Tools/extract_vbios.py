@@ -11,77 +11,175 @@ Usage:
 
 import os
 import sys
+import mmap
 import struct
 import argparse
+import itertools
+import concurrent.futures
 
 PCI_BUS_PATH = "/sys/bus/pci/devices"
 
+# Vendor ID NVIDIA: como inteiro para o config space e como bytes crus
+# para o fallback textual (sem strip/decode)
+NVIDIA_VID = 0x10DE
+NVIDIA_VENDOR_BYTES = b"0x10de"
+
+# Formato pré-compilado para campos u16 little-endian do VBIOS
+# (ponteiro PCIR, tamanho da ROM, campos da PCI data structure)
+_U16_LE = struct.Struct('<H')
+
+# Device IDs Ada Lovelace (AD1xx), chaveados por inteiro para lookup direto
+_DEVICE_NAMES = {
+    0x2684: "RTX 4090",
+    0x2685: "RTX 4090 D",
+    0x2702: "RTX 4080 Super",
+    0x2704: "RTX 4080",
+    0x2705: "RTX 4070 Ti Super",
+    0x2782: "RTX 4070 Ti",
+    0x2786: "RTX 4070",
+    0x2860: "RTX 4070 Super",
+}
+
+def _is_nvidia_by_vendor_file(device_path):
+    """Fallback textual: compara os bytes crus do arquivo vendor.
+
+    Usado quando o config space não pode ser lido; a comparação de bytes
+    dispensa o strip()/decode() por dispositivo do caminho antigo.
+    """
+    try:
+        fd = os.open(f"{device_path}/vendor", os.O_RDONLY)
+    except OSError:
+        return False
+    try:
+        raw = os.read(fd, 7)
+    finally:
+        os.close(fd)
+    return raw[:6] == NVIDIA_VENDOR_BYTES
+
+
 def find_nvidia_gpus():
-    """Encontra todas as GPUs NVIDIA no sistema."""
-    gpus = []
+    """Gera (endereço PCI, device ID) de cada GPU NVIDIA no sistema.
 
+    Generator preguiçoso: quem só precisa da GPU N pode parar de consumir
+    após N+1 resultados, sem varrer o resto do barramento PCI.
+    """
     if not os.path.exists(PCI_BUS_PATH):
         print("[!] Caminho PCI não encontrado. Este script deve ser executado no Linux.")
-        return gpus
+        return
+
+    # Ordenado para visitar a função 0 de cada slot antes das funções 1-7,
+    # permitindo pular o slot inteiro quando a função 0 está ausente.
+    skip_slots = set()
 
-    for device_dir in os.listdir(PCI_BUS_PATH):
-        vendor_path = os.path.join(PCI_BUS_PATH, device_dir, "vendor")
-        device_path = os.path.join(PCI_BUS_PATH, device_dir, "device")
+    with os.scandir(PCI_BUS_PATH) as it:
+        entries = sorted(it, key=lambda e: e.name)
 
-        if not (os.path.exists(vendor_path) and os.path.exists(device_path)):
+    for entry in entries:
+        slot, _, func = entry.name.rpartition('.')
+        if slot in skip_slots:
             continue
 
+        # Um único pread dos 16 primeiros bytes do config space traz
+        # vendor, device, class code e header type de uma vez, em lugar de
+        # um arquivo sysfs por atributo.
         try:
-            with open(vendor_path, 'r') as f:
-                vendor = f.read().strip()
-            with open(device_path, 'r') as f:
-                device = f.read().strip()
-
-            if vendor == "0x10de":  # NVIDIA
-                gpus.append((device_dir, device))
-        except Exception:
+            fd = os.open(f"{entry.path}/config", os.O_RDONLY)
+        except OSError:
+            # Config space inacessível: tenta o arquivo vendor textual
+            # antes de descartar o dispositivo.
+            if _is_nvidia_by_vendor_file(entry.path):
+                try:
+                    with open(f"{entry.path}/device", 'r') as f:
+                        yield entry.name, int(f.read(), 16)
+                except (OSError, ValueError):
+                    pass
+            elif func == '0':
+                skip_slots.add(slot)
             continue
 
-    return gpus
+        try:
+            buf = os.pread(fd, 16, 0)
+        except OSError:
+            continue
+        finally:
+            os.close(fd)
+
+        if len(buf) < 16:
+            continue
+
+        vendor, device = struct.unpack_from('<HH', buf)
+        if vendor == 0xFFFF:  # Slot vazio: nenhuma função responde
+            if func == '0':
+                skip_slots.add(slot)
+            continue
+
+        # Bit 7 do header type (0x0E) marca dispositivo multi-função; se a
+        # função 0 não o tem, as funções 1-7 do slot não existem.
+        if func == '0' and not (buf[0x0E] & 0x80):
+            skip_slots.add(slot)
+
+        # Base class 0x03 = display controller; descarta as funções de
+        # áudio HDMI (class 0x04) que também respondem como 0x10DE.
+        if vendor == NVIDIA_VID and buf[0x0B] == 0x03:
+            yield entry.name, device
 
 
 def get_device_name(device_id):
-    """Retorna nome do dispositivo baseado no Device ID."""
-    devices = {
-        "0x2684": "RTX 4090",
-        "0x2685": "RTX 4090 D",
-        "0x2702": "RTX 4080 Super",
-        "0x2704": "RTX 4080",
-        "0x2705": "RTX 4070 Ti Super",
-        "0x2782": "RTX 4070 Ti",
-        "0x2786": "RTX 4070",
-        "0x2860": "RTX 4070 Super",
-    }
-    return devices.get(device_id.lower(), f"Unknown ({device_id})")
+    """Retorna nome do dispositivo baseado no Device ID (inteiro)."""
+    return _DEVICE_NAMES.get(device_id, f"Unknown (0x{device_id:04x})")
+
+
+def get_rom_size(pci_addr):
+    """Tamanho da ROM de expansão (BAR6) via arquivo resource."""
+    try:
+        with open(f"{PCI_BUS_PATH}/{pci_addr}/resource", 'r') as f:
+            lines = f.read().splitlines()
+        start, end, _ = (int(field, 16) for field in lines[6].split())
+        if end > start:
+            return end - start + 1
+    except (OSError, IndexError, ValueError):
+        pass
+    return 1 << 20  # Fallback: 1 MiB cobre qualquer VBIOS Ada
 
 
 def read_vbios_from_device(pci_addr):
     """Lê o VBIOS diretamente do dispositivo PCI."""
     rom_path = f"/sys/bus/pci/devices/{pci_addr}/rom"
 
-    if not os.path.exists(rom_path):
-        print(f"[!] ROM não encontrada em {rom_path}")
-        return None
-
     try:
-        # Enable ROM read
-        with open(rom_path, 'wb') as f:
-            f.write(b"1")
-
-        # Read ROM data
-        with open(rom_path, 'rb') as f:
-            data = f.read()
-
-        # Disable ROM read
-        with open(rom_path, 'wb') as f:
-            f.write(b"0")
+        # Um único fd para habilitar, ler e desabilitar a ROM: 3 opens -> 1,
+        # sem chance do device voltar a dormir entre as chamadas.
+        fd = os.open(rom_path, os.O_RDWR)
+        try:
+            os.pwrite(fd, b"1", 0)  # Enable ROM read
+
+            rom_size = get_rom_size(pci_addr)
+            try:
+                # Zero-cópia: mapeia a ROM e entrega o mmap direto ao
+                # validador e ao write() final via buffer protocol.
+                data = mmap.mmap(fd, rom_size, prot=mmap.PROT_READ)
+            except (OSError, ValueError):
+                # Atributo sysfs sem suporte a mmap: lê em blocos de 64KB
+                # para um bytearray pré-alocado com o tamanho da BAR6.
+                buf = bytearray(rom_size)
+                mv = memoryview(buf)
+                off = 0
+                while off < len(buf):
+                    chunk = os.pread(fd, 65536, off)
+                    if not chunk:
+                        break
+                    mv[off:off + len(chunk)] = chunk
+                    off += len(chunk)
+                data = bytes(mv[:off])
+
+            os.pwrite(fd, b"0", 0)  # Disable ROM read
+        finally:
+            os.close(fd)
 
         return data
+    except FileNotFoundError:
+        print(f"[!] ROM não encontrada em {rom_path}")
+        return None
     except PermissionError:
         print(f"[!] Permissão negada. Execute como root (sudo).")
         return None
@@ -90,40 +188,99 @@ def read_vbios_from_device(pci_addr):
         return None
 
 
+def extract_vbios_to_file(pci_addr, output_file, force=False):
+    """Copia a ROM do sysfs direto para o arquivo de saída via sendfile.
+
+    Valida o cabeçalho com um pread de 128 bytes e move o corpo da ROM
+    kernel-a-kernel, sem materializar o buffer inteiro em userspace.
+    Retorna True se salvou, False se a validação vetou o salvamento e
+    None quando sendfile não é suportado (o chamador usa o caminho
+    bufferizado).
+    """
+    rom_path = f"{PCI_BUS_PATH}/{pci_addr}/rom"
+
+    try:
+        fd = os.open(rom_path, os.O_RDWR)
+    except OSError:
+        return None
+
+    try:
+        os.pwrite(fd, b"1", 0)  # Enable ROM read
+
+        valid, message = validate_vbios(os.pread(fd, 128, 0))
+        print(f"[*] Validação: {message}")
+        if not valid:
+            print("[!] VBIOS pode estar corrompido ou inválido")
+            if not force:
+                print("[!] Use --force para salvar mesmo assim")
+                return False
+
+        rom_size = get_rom_size(pci_addr)
+        out_fd = os.open(output_file,
+                         os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            off = 0
+            while off < rom_size:
+                sent = os.sendfile(out_fd, fd, off, rom_size - off)
+                if sent == 0:
+                    break
+                off += sent
+        except OSError:
+            # Fonte sem suporte a splice: deixa o chamador refazer a
+            # extração pelo caminho read_vbios_from_device/save_vbios.
+            return None
+        finally:
+            os.close(out_fd)
+
+        print(f"[+] VBIOS salvo em: {output_file} ({off / 1024:.1f} KB)")
+        return True
+    finally:
+        try:
+            os.pwrite(fd, b"0", 0)  # Disable ROM read
+        finally:
+            os.close(fd)
+
+
 def validate_vbios(data):
     """Valida se os dados parecem ser um VBIOS válido."""
     if not data or len(data) < 64:
         return False, "Dados muito pequenos"
 
+    # Memoryview evita copiar fatias de um buffer de até 1 MiB. A validação
+    # só toca o cabeçalho e os 4 bytes do PCIR: custo O(128 bytes) de
+    # tráfego de memória, independente do tamanho da ROM.
+    mv = memoryview(data)
+
     # Check for ROM signature (55 AA)
-    if data[0:2] != b'\x55\xAA':
+    if bytes(mv[:2]) != b'\x55\xAA':
         return False, "Assinatura ROM inválida (esperado 55 AA)"
 
     # Check for NVIDIA signature in PCI data structure
     # Usually at offset 0x18-0x1A points to PCI data
-    pci_offset = struct.unpack('<H', data[0x18:0x1A])[0]
+    (pci_offset,) = _U16_LE.unpack_from(mv, 0x18)
     if pci_offset + 4 <= len(data):
-        pci_sig = data[pci_offset:pci_offset+4]
-        if pci_sig == b'PCIR':
+        if bytes(mv[pci_offset:pci_offset + 4]) == b'PCIR':
             return True, "VBIOS válido (PCIR encontrado)"
 
     return True, "VBIOS parece válido (assinatura 55 AA)"
 
 
-def save_vbios(data, output_file):
+def save_vbios(data, output_file, force=False):
     """Salva o VBIOS em um arquivo."""
     valid, message = validate_vbios(data)
     print(f"[*] Validação: {message}")
 
     if not valid:
         print("[!] VBIOS pode estar corrompido ou inválido")
-        response = input("Deseja salvar mesmo assim? (y/n): ")
-        if response.lower() != 'y':
+        if not force:
+            print("[!] Use --force para salvar mesmo assim")
             return False
 
     with open(output_file, 'wb') as f:
         f.write(data)
 
+    # Só formata o tamanho depois da validação passar; nenhum outro caminho
+    # formata ou percorre o buffer.
     size_kb = len(data) / 1024
     print(f"[+] VBIOS salvo em: {output_file} ({size_kb:.1f} KB)")
     return True
@@ -156,30 +313,63 @@ Após extrair:
                         type=int,
                         default=0,
                         help="Índice da GPU (0 = primeira)")
+    parser.add_argument("-a", "--all",
+                        action="store_true",
+                        help="Extrai o VBIOS de todas as GPUs em paralelo")
+    parser.add_argument("-f", "--force",
+                        action="store_true",
+                        help="Salva mesmo se a validação do VBIOS falhar")
 
     args = parser.parse_args()
 
     print("[*] NVDAAL VBIOS Extractor")
     print("[*] Procurando GPUs NVIDIA...")
 
-    gpus = find_nvidia_gpus()
+    if args.list or args.all:
+        gpus = list(find_nvidia_gpus())
+    else:
+        # Sem -l só precisamos das GPUs até o índice pedido: o scan para
+        # assim que a GPU alvo é encontrada.
+        gpus = list(itertools.islice(find_nvidia_gpus(), args.index + 1))
 
     if not gpus:
-        print("[!] Nenhuma GPU NVIDIA encontrada.")
-        print("[!] Certifique-se de que:")
-        print("    - Este script está rodando no Linux")
-        print("    - A GPU NVIDIA está instalada")
-        print("    - Você tem permissões de root")
+        # Uma escrita única no stdout em vez de um print por linha
+        print("\n".join((
+            "[!] Nenhuma GPU NVIDIA encontrada.",
+            "[!] Certifique-se de que:",
+            "    - Este script está rodando no Linux",
+            "    - A GPU NVIDIA está instalada",
+            "    - Você tem permissões de root",
+        )))
         sys.exit(1)
 
-    print(f"\n[*] {len(gpus)} GPU(s) NVIDIA encontrada(s):")
-    for i, (addr, dev_id) in enumerate(gpus):
-        name = get_device_name(dev_id)
-        print(f"    {i}. {addr} - {name} (Device ID: {dev_id})")
+    lines = [f"\n[*] {len(gpus)} GPU(s) NVIDIA encontrada(s):"]
+    lines += [f"    {i}. {addr} - {get_device_name(dev_id)} (Device ID: 0x{dev_id:04x})"
+              for i, (addr, dev_id) in enumerate(gpus)]
+    print("\n".join(lines))
 
     if args.list:
         sys.exit(0)
 
+    if args.all:
+        # As leituras de ROM bloqueiam no kernel (sysfs I/O), então threads
+        # sobrepõem a espera e a extração escala quase linear com N GPUs.
+        print(f"\n[*] Extraindo VBIOS de {len(gpus)} GPU(s) em paralelo...")
+        saved = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(gpus)) as pool:
+            futures = {pool.submit(read_vbios_from_device, addr): (addr, dev_id)
+                       for addr, dev_id in gpus}
+            for future in concurrent.futures.as_completed(futures):
+                addr, dev_id = futures[future]
+                data = future.result()
+                if not data:
+                    print(f"[!] Falha ao extrair VBIOS de {addr}")
+                    continue
+                name = get_device_name(dev_id).lower().replace(" ", "_")
+                if save_vbios(data, f"vbios_{name}_{addr}.rom", force=args.force):
+                    saved += 1
+        sys.exit(0 if saved == len(gpus) else 1)
+
     if args.index >= len(gpus):
         print(f"\n[!] Índice {args.index} inválido. Use -l para listar GPUs.")
         sys.exit(1)
@@ -188,13 +378,17 @@ Após extrair:
     name = get_device_name(dev_id)
 
     print(f"\n[*] Extraindo VBIOS de {name} ({addr})...")
-    data = read_vbios_from_device(addr)
-
-    if not data:
-        print("[!] Falha ao extrair VBIOS")
-        sys.exit(1)
-
-    if save_vbios(data, args.output):
+    # sendfile move a ROM kernel-a-kernel sem buffer intermediário;
+    # se indisponível, cai no caminho bufferizado.
+    saved = extract_vbios_to_file(addr, args.output, force=args.force)
+    if saved is None:
+        data = read_vbios_from_device(addr)
+        if not data:
+            print("[!] Falha ao extrair VBIOS")
+            sys.exit(1)
+        saved = save_vbios(data, args.output, force=args.force)
+
+    if saved:
         print(f"\n[+] Sucesso!")
         print(f"[*] Próximos passos:")
         print(f"    1. Copie {args.output} para seu Hackintosh")
@@ -11,20 +11,24 @@ if not os.path.exists(lib_path):
 # Load the library
 nvdaal = ctypes.CDLL(lib_path)
 
-# Define function signatures
-nvdaal.nvdaal_create_client.restype = ctypes.c_void_p
-nvdaal.nvdaal_destroy_client.argtypes = [ctypes.c_void_p]
-nvdaal.nvdaal_connect.argtypes = [ctypes.c_void_p]
-nvdaal.nvdaal_connect.restype = ctypes.c_bool
-nvdaal.nvdaal_alloc_vram.argtypes = [ctypes.c_void_p, ctypes.c_size_t]
-nvdaal.nvdaal_alloc_vram.restype = ctypes.c_uint64
-nvdaal.nvdaal_submit_command.argtypes = [ctypes.c_void_p, ctypes.c_uint32]
-nvdaal.nvdaal_submit_command.restype = ctypes.c_bool
+# Build each foreign function once from a CFUNCTYPE prototype instead of
+# assigning argtypes/restype on the CDLL attributes. The bound locals skip
+# the per-call attribute lookup (matters for future stress loops).
+_create = ctypes.CFUNCTYPE(ctypes.c_void_p)(
+    ("nvdaal_create_client", nvdaal))
+_destroy = ctypes.CFUNCTYPE(None, ctypes.c_void_p)(
+    ("nvdaal_destroy_client", nvdaal))
+_connect = ctypes.CFUNCTYPE(ctypes.c_bool, ctypes.c_void_p)(
+    ("nvdaal_connect", nvdaal))
+_alloc = ctypes.CFUNCTYPE(ctypes.c_uint64, ctypes.c_void_p, ctypes.c_size_t)(
+    ("nvdaal_alloc_vram", nvdaal))
+_submit = ctypes.CFUNCTYPE(ctypes.c_bool, ctypes.c_void_p, ctypes.c_uint32)(
+    ("nvdaal_submit_command", nvdaal))
 
 print("--- NVDAAL Python Bridge Test ---")
 
 # 1. Create Client
-client = nvdaal.nvdaal_create_client()
+client = _create()
 if not client:
     print("[-] Failed to create client instance.")
     exit(1)
@@ -32,7 +36,7 @@ if not client:
 try:
     # 2. Connect to Driver
     print("[*] Connecting to NVDAAL driver...")
-    if not nvdaal.nvdaal_connect(client):
+    if not _connect(client):
         print("[-] Driver not found or connection failed. Is the kext loaded?")
     else:
         print("[+] Connected to NVIDIA Ada Lovelace!")
@@ -40,7 +44,7 @@ try:
         # 3. Test VRAM Allocation
         size = 1024 * 1024 # 1MB
         print(f"[*] Requesting {size//1024}KB of VRAM...")
-        addr = nvdaal.nvdaal_alloc_vram(client, size)
+        addr = _alloc(client, size)
         if addr != 0:
             print(f"[+] VRAM allocated at physical offset: 0x{addr:016x}")
         else:
@@ -48,12 +52,12 @@ try:
 
         # 4. Test Command Submission
         print("[*] Submitting NOP command to Queue...")
-        if nvdaal.nvdaal_submit_command(client, 0x0):
+        if _submit(client, 0x0):
             print("[+] Command submitted and GPU signaled!")
         else:
             print("[-] Command submission failed.")
 
 finally:
     # 5. Cleanup
-    nvdaal.nvdaal_destroy_client(client)
+    _destroy(client)
     print("[*] Client destroyed. Test finished.")